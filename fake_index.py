@@ -0,0 +1,124 @@
+import hashlib
+import hmac
+import string
+
+
+class FeistelPermutation:
+    """
+    Keyed bijection on range(size).
+
+    A balanced Feistel network over the smallest even number of bits that
+    covers size, with cycle-walking for the values that fall outside it.
+    Since the network covers fewer than 4 * size values, a lookup takes a
+    few rounds on average and needs no state.
+    """
+    def __init__(self, size, key, rounds=4):
+        if size < 1:
+            raise ValueError('permutation size must be positive')
+        self.size = size
+        self.key = str(key)
+        self.rounds = rounds
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+
+    def _round(self, value, rnd, tweak):
+        digest = hashlib.blake2b(f'{self.key}:{tweak}:{rnd}:{value}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') & self.mask
+
+    def _encrypt(self, value, tweak):
+        left, right = value >> self.half, value & self.mask
+        for rnd in range(self.rounds):
+            left, right = right, left ^ self._round(right, rnd, tweak)
+        return (left << self.half) | right
+
+    def __call__(self, index, tweak=0):
+        if not 0 <= index < self.size:
+            raise IndexError('permutation index out of range')
+        value = self._encrypt(index, tweak)
+        while value >= self.size:
+            value = self._encrypt(value, tweak)
+        return value
+
+
+class UrlGenerator:
+    """The i-th fake URL over all ordered pairs of distinct domains."""
+    def __init__(self, domain_pool, key):
+        # Dedupe after lowercasing so distinct indexes give distinct URLs
+        self.domains = list(dict.fromkeys(d.lower() for d in domain_pool))
+        n = len(self.domains)
+        self.size = n * (n - 1)
+        self.permutation = FeistelPermutation(self.size, key) if self.size else None
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index >= self.size:
+            raise IndexError('url space exhausted')
+        pair = self.permutation(index)
+        first, second = divmod(pair, len(self.domains) - 1)
+        if second >= first:
+            second += 1
+        return f"https://{self.domains[first]}.{self.domains[second]}.co"
+
+
+def letter_suffix(block):
+    """0 -> 'a', 25 -> 'z', 26 -> 'aa', ... (bijective base 26)."""
+    letters = []
+    block += 1
+    while block:
+        block, rem = divmod(block - 1, 26)
+        letters.append(string.ascii_lowercase[rem])
+    return ''.join(reversed(letters))
+
+
+def name_fallback(base, block):
+    return base + letter_suffix(block)
+
+
+def company_fallback(base, block):
+    return f"{base} Group {block + 1}"
+
+
+def email_fallback(base, block):
+    name, domain = base.split('@')
+    return f"{name}{block + 1}@{domain}"
+
+
+class FallbackGenerator:
+    """
+    The i-th fallback value over base x suffix.
+
+    Index i picks suffix block i // len(pool) and a base from a per-block
+    keyed permutation of the pool, so every index yields a different
+    (base, suffix) pair without retries or bookkeeping.
+    """
+    def __init__(self, pool, key, formatter):
+        self.pool = pool
+        self.formatter = formatter
+        self.permutation = FeistelPermutation(len(pool), key) if len(pool) else None
+
+    def __getitem__(self, index):
+        if self.permutation is None:
+            raise IndexError('empty fallback pool')
+        block, offset = divmod(index, len(self.pool))
+        return self.formatter(self.pool[self.permutation(offset, tweak=block)], block)
+
+
+FALLBACK_FORMATTERS = {
+    'names': name_fallback,
+    'company': company_fallback,
+    'emails': email_fallback,
+}
+
+
+def keyed_digest(secret_key, entity, original, attempt=0):
+    """HMAC-SHA256 of (entity, original, attempt); identical in every worker holding the key."""
+    message = f'{entity}\x1f{original}\x1f{attempt}'.encode('utf-8')
+    return hmac.new(secret_key, message, hashlib.sha256).digest()
+
+
+def keyed_index(secret_key, entity, original, attempt, size):
+    return int.from_bytes(keyed_digest(secret_key, entity, original, attempt)[:8], 'little') % size
@@ -0,0 +1,121 @@
+import argparse
+import gzip
+import json
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+
+MAGIC = b'FPOOL001'
+HEADER = struct.Struct('<8sQ')  # magic, number of values
+POOL_EXTENSION = '.pool'
+
+
+def build_faker_pool(faker_data_path, out_dir):
+    """
+    Convert faker_dataset_v3.json.gz into one <entity>.pool file per entity.
+
+    Each file is a small header, an offsets array of count+1 little-endian
+    uint64 values and the UTF-8 blob of all values back to back, so a value
+    is a slice of the memory-mapped file.
+    """
+    with gzip.open(faker_data_path, 'rt', encoding='utf-8') as f:
+        faker_list = json.load(f)
+    faker_data = {}
+    for d in faker_list:
+        faker_data.update(d)
+    os.makedirs(out_dir, exist_ok=True)
+    for entity, values in faker_data.items():
+        blobs = [str(v).encode('utf-8') for v in values]
+        offsets = array('Q', [0])
+        total = 0
+        for blob in blobs:
+            total += len(blob)
+            offsets.append(total)
+        if offsets.itemsize != 8:
+            raise RuntimeError("array('Q') is not 64-bit on this platform")
+        if struct.pack('=H', 1) != struct.pack('<H', 1):
+            offsets.byteswap()
+        tmp_path = os.path.join(out_dir, entity + POOL_EXTENSION + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(blobs)))
+            offsets.tofile(f)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, os.path.join(out_dir, entity + POOL_EXTENSION))
+        print(f"{entity}: {len(blobs)} values, {total} bytes")
+    return out_dir
+
+
+class PoolList(Sequence):
+    """Read-only list of one entity's values, decoded from the mmap on access."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a faker pool file")
+        self.offsets_start = HEADER.size
+        self.blob_start = HEADER.size + 8 * (self.count + 1)
+        self.offsets = memoryview(self.mm)[self.offsets_start:self.blob_start].cast('Q')
+        self.little_endian = struct.pack('=H', 1) == struct.pack('<H', 1)
+
+    def _offset(self, i):
+        if self.little_endian:
+            return self.offsets[i]
+        return struct.unpack_from('<Q', self.mm, self.offsets_start + 8 * i)[0]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('faker pool index out of range')
+        start = self.blob_start + self._offset(index)
+        end = self.blob_start + self._offset(index + 1)
+        return self.mm[start:end].decode('utf-8')
+
+
+class FakerPool(Mapping):
+    """entity -> PoolList, mapping each entity file only when it is first used."""
+    def __init__(self, pool_dir):
+        self.pool_dir = pool_dir
+        self.entities = sorted(
+            name[:-len(POOL_EXTENSION)] for name in os.listdir(pool_dir) if name.endswith(POOL_EXTENSION)
+        )
+        self.loaded = {}
+
+    def __getitem__(self, entity):
+        pool = self.loaded.get(entity)
+        if pool is None:
+            if entity not in self.entities:
+                raise KeyError(entity)
+            pool = PoolList(os.path.join(self.pool_dir, entity + POOL_EXTENSION))
+            self.loaded[entity] = pool
+        return pool
+
+    def __contains__(self, entity):
+        return entity in self.entities
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def __len__(self):
+        return len(self.entities)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--faker_data_path', type=str, default='faker_dataset_v3.json.gz')
+    parser.add_argument('--out_dir', type=str, default='faker_pool')
+    args = parser.parse_args()
+    start = time.time()
+    build_faker_pool(args.faker_data_path, args.out_dir)
+    print(f"⏳ Faker pool built in {time.time()-start:.6f} seconds")
@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+from datetime import datetime
+
+FORWARD = 'forward'
+BACKWARD = 'backward'
+STORE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    seq INTEGER PRIMARY KEY,
+    entity_id INTEGER NOT NULL,
+    original TEXT NOT NULL,
+    fake TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pairs_forward ON pairs(original, entity_id);
+CREATE INDEX IF NOT EXISTS pairs_backward ON pairs(fake, entity_id);
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def is_store_path(path):
+    return str(path).lower().endswith(STORE_EXTENSIONS)
+
+
+class MappingStore:
+    """
+    SQLite-backed forward/backward mapping.
+
+    Pairs live in one table with a unique (original, entity) index for the
+    forward direction and a (fake, entity) index for the backward one, so
+    opening the store costs the same no matter how many pairs it holds and
+    every lookup is a single index probe. Later entities never shadow earlier
+    ones in the merged views, matching the JSON dict iteration order.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.entity_ids = dict(self.conn.execute('SELECT name, id FROM entities ORDER BY id'))
+
+    def close(self):
+        self.conn.close()
+
+    def entities(self):
+        return list(self.entity_ids)
+
+    def entity_id(self, entity, create=False):
+        entity_id = self.entity_ids.get(entity)
+        if entity_id is None and create:
+            with self.lock, self.conn:
+                cur = self.conn.execute('INSERT OR IGNORE INTO entities(name) VALUES (?)', (entity,))
+                entity_id = cur.lastrowid if cur.rowcount else self.conn.execute(
+                    'SELECT id FROM entities WHERE name = ?', (entity,)).fetchone()[0]
+            self.entity_ids[entity] = entity_id
+        return entity_id
+
+    def lookup(self, direction, entity, key):
+        """Fake for an original (forward) or original for a fake (backward), else None."""
+        entity_id = self.entity_ids.get(entity)
+        if entity_id is None or not isinstance(key, (str, int, float)):
+            return None
+        if direction == FORWARD:
+            sql = 'SELECT fake FROM pairs WHERE original = ? AND entity_id = ?'
+        else:
+            sql = 'SELECT original FROM pairs WHERE fake = ? AND entity_id = ? ORDER BY seq DESC LIMIT 1'
+        with self.lock:
+            row = self.conn.execute(sql, (key, entity_id)).fetchone()
+        return row[0] if row else None
+
+    def lookup_any(self, direction, key):
+        """Lookup across all entities; the first entity holding the key wins."""
+        if not isinstance(key, (str, int, float)):
+            return None
+        if direction == FORWARD:
+            sql = 'SELECT fake FROM pairs WHERE original = ? ORDER BY entity_id LIMIT 1'
+        else:
+            sql = 'SELECT original FROM pairs WHERE fake = ? ORDER BY entity_id, seq DESC LIMIT 1'
+        with self.lock:
+            row = self.conn.execute(sql, (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_fake(self, entity, original):
+        return self.lookup(FORWARD, entity, original)
+
+    def get_original(self, entity, fake):
+        return self.lookup(BACKWARD, entity, fake)
+
+    def count(self, entity=None):
+        with self.lock:
+            if entity is None:
+                return self.conn.execute('SELECT COUNT(*) FROM pairs').fetchone()[0]
+            entity_id = self.entity_ids.get(entity)
+            if entity_id is None:
+                return 0
+            return self.conn.execute('SELECT COUNT(*) FROM pairs WHERE entity_id = ?', (entity_id,)).fetchone()[0]
+
+    def iter_pairs(self, entity=None):
+        """Yield (entity, original, fake) in insertion order, entity by entity."""
+        names = {entity_id: name for name, entity_id in self.entity_ids.items()}
+        if entity is None:
+            cur = self.conn.execute('SELECT entity_id, original, fake FROM pairs ORDER BY entity_id, seq')
+        else:
+            cur = self.conn.execute('SELECT entity_id, original, fake FROM pairs WHERE entity_id = ? ORDER BY seq',
+                                    (self.entity_ids.get(entity, -1),))
+        for entity_id, original, fake in cur:
+            yield names[entity_id], original, fake
+
+    def add_pairs(self, rows):
+        """Insert or update (entity, original, fake) rows in a single transaction."""
+        rows = list(rows)
+        for entity in dict.fromkeys(row[0] for row in rows):
+            self.entity_id(entity, create=True)
+        with self.lock, self.conn:
+            self.conn.executemany(
+                'INSERT INTO pairs(entity_id, original, fake) VALUES (?, ?, ?) '
+                'ON CONFLICT(original, entity_id) DO UPDATE SET fake = excluded.fake',
+                ((self.entity_ids[entity], original, fake) for entity, original, fake in rows))
+            self.conn.execute('INSERT OR REPLACE INTO metadata(key, value) VALUES (?, ?)',
+                              ('timestamp', json.dumps(datetime.now().isoformat())))
+        return len(rows)
+
+    def delete(self, direction, entity, key):
+        entity_id = self.entity_ids.get(entity)
+        if entity_id is None:
+            return 0
+        column = 'original' if direction == FORWARD else 'fake'
+        with self.lock, self.conn:
+            return self.conn.execute(f'DELETE FROM pairs WHERE {column} = ? AND entity_id = ?',
+                                     (key, entity_id)).rowcount
+
+    def metadata(self):
+        with self.lock:
+            return {key: json.loads(value) for key, value in self.conn.execute('SELECT key, value FROM metadata')}
+
+    def set_metadata(self, **values):
+        with self.lock, self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO metadata(key, value) VALUES (?, ?)',
+                                  ((key, json.dumps(value)) for key, value in values.items()))
+
+    def forward_view(self):
+        return MappingView(self, FORWARD)
+
+    def backward_view(self):
+        return MappingView(self, BACKWARD)
+
+    def merged_view(self, direction):
+        return MergedView(self, direction)
+
+    def to_dicts(self):
+        """Materialize the whole store as forward/backward dicts."""
+        forward, backward = {}, {}
+        for entity in self.entity_ids:
+            forward[entity] = {}
+            backward[entity] = {}
+        for entity, original, fake in self.iter_pairs():
+            forward[entity][original] = fake
+            backward[entity][fake] = original
+        return forward, backward
+
+
+class _ScanItems(ItemsView):
+    def __iter__(self):
+        return self._mapping.scan()
+
+
+class _ScanValues(ValuesView):
+    def __iter__(self):
+        for _, value in self._mapping.scan():
+            yield value
+
+
+class EntityView(MutableMapping):
+    """Dict-like view of one entity in one direction, read from the store on demand."""
+    def __init__(self, store, entity, direction):
+        self.store = store
+        self.entity = entity
+        self.direction = direction
+
+    def __getitem__(self, key):
+        value = self.store.lookup(self.direction, self.entity, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.store.lookup(self.direction, self.entity, key) is not None
+
+    def get(self, key, default=None):
+        value = self.store.lookup(self.direction, self.entity, key)
+        return default if value is None else value
+
+    def __setitem__(self, key, value):
+        if self.direction == FORWARD:
+            self.store.add_pairs([(self.entity, key, value)])
+        else:
+            self.store.add_pairs([(self.entity, value, key)])
+
+    def __delitem__(self, key):
+        if not self.store.delete(self.direction, self.entity, key):
+            raise KeyError(key)
+
+    def scan(self):
+        for _, original, fake in self.store.iter_pairs(self.entity):
+            yield (original, fake) if self.direction == FORWARD else (fake, original)
+
+    def __iter__(self):
+        for key, _ in self.scan():
+            yield key
+
+    def __len__(self):
+        return self.store.count(self.entity)
+
+    def items(self):
+        return _ScanItems(self)
+
+    def values(self):
+        return _ScanValues(self)
+
+
+class MappingView(Mapping):
+    """entity -> EntityView, shaped like the forward_mapping/backward_mapping dicts."""
+    def __init__(self, store, direction):
+        self.store = store
+        self.direction = direction
+
+    def __getitem__(self, entity):
+        if entity not in self.store.entity_ids:
+            raise KeyError(entity)
+        return EntityView(self.store, entity, self.direction)
+
+    def __iter__(self):
+        return iter(self.store.entities())
+
+    def __len__(self):
+        return len(self.store.entity_ids)
+
+    def setdefault(self, entity, default=None):
+        self.store.entity_id(entity, create=True)
+        return EntityView(self.store, entity, self.direction)
+
+
+class MergedView(Mapping):
+    """Key -> value across all entities, the first entity holding the key wins."""
+    def __init__(self, store, direction):
+        self.store = store
+        self.direction = direction
+
+    def __getitem__(self, key):
+        value = self.store.lookup_any(self.direction, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.store.lookup_any(self.direction, key) is not None
+
+    def get(self, key, default=None):
+        value = self.store.lookup_any(self.direction, key)
+        return default if value is None else value
+
+    def __iter__(self):
+        seen = set()
+        for _, original, fake in self.store.iter_pairs():
+            key = original if self.direction == FORWARD else fake
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def import_json(json_path, store_path=None):
+    """One-shot import of a *_mapping.json file into a MappingStore."""
+    if store_path is None:
+        store_path = os.path.splitext(json_path)[0] + '.db'
+    with open(json_path, 'r') as f:
+        data = json.load(f)
+    forward_mapping = data.get('forward_mapping', {})
+    backward_mapping = data.get('backward_mapping', {})
+    store = MappingStore(store_path)
+    rows = [(entity, original, fake)
+            for entity, value_map in forward_mapping.items()
+            for original, fake in value_map.items()]
+    # Backward-only pairs can't be represented if they contradict the forward side
+    skipped = 0
+    for entity, value_map in backward_mapping.items():
+        forward = forward_mapping.get(entity, {})
+        for fake, original in value_map.items():
+            if original not in forward:
+                rows.append((entity, original, fake))
+            elif forward[original] != fake:
+                skipped += 1
+    store.add_pairs(rows)
+    if 'metadata' in data:
+        store.set_metadata(**data['metadata'])
+    print(f"Imported {len(rows)} pairs from {json_path} into {store_path}")
+    if skipped:
+        print(f"Warning: skipped {skipped} backward pairs that contradict the forward mapping")
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('json_paths', nargs='+', help='*_mapping.json files to import')
+    parser.add_argument('--store_path', type=str, default=None)
+    args = parser.parse_args()
+    for json_path in args.json_paths:
+        import_json(json_path, args.store_path).close()
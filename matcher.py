@@ -0,0 +1,168 @@
+import re
+
+# Same bracket/quote characters the old alternation regex allowed around a key
+PREFIX_CHARS = frozenset('{(["\'*_')
+SUFFIX_CHARS = frozenset('})]"\'*_')
+COMPANY_SUFFIX_RE = re.compile(r'\b(co|llc|inc|group|international|corporation|ltd|)\.?$', flags=re.IGNORECASE)
+_END = ''  # terminal marker inside a trie node, never a real character
+
+
+def _is_word(ch):
+    # Mirrors the unicode \w class used by re
+    return ch.isalnum() or ch == '_'
+
+
+def _lower_same_length(text):
+    """Lowercase text without changing its length so offsets stay valid."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+def company_core(fake_lower):
+    """Strip the co/llc/inc/... suffix the same way unmask_summary always has."""
+    core = COMPANY_SUFFIX_RE.sub('', fake_lower).strip()
+    if core and core != fake_lower:
+        return core
+    return None
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive multi-keyword replacer backed by a character trie.
+
+    Built once and updated in place with add()/remove(). replace() walks the
+    trie only from positions where a key may start, so the cost depends on the
+    text length and not on how many keys are loaded. Output is identical to the
+    old per-call regex:
+        (?<!\\w)([{(["'*_]*?)(key1|key2|...)([})\\]"'*_]*?)(?!\\w)
+    with keys sorted longest first.
+    """
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        node = self._find(key.lower())
+        return node is not None and _END in node
+
+    def _find(self, key):
+        node = self.root
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node
+
+    def get(self, key, default=None):
+        node = self._find(key.lower())
+        if node is None or _END not in node:
+            return default
+        return node[_END]
+
+    def add(self, key, value):
+        """Insert or overwrite key (matched case-insensitively)."""
+        if not key:
+            return
+        node = self.root
+        for ch in _lower_same_length(key):
+            node = node.setdefault(ch, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = value
+
+    def remove(self, key):
+        """Drop key and prune the branch it leaves behind."""
+        key = _lower_same_length(key)
+        path = [self.root]
+        for ch in key:
+            nxt = path[-1].get(ch)
+            if nxt is None:
+                return False
+            path.append(nxt)
+        if _END not in path[-1]:
+            return False
+        del path[-1][_END]
+        self.size -= 1
+        for i in range(len(key), 0, -1):
+            if path[i]:
+                break
+            del path[i - 1][key[i - 1]]
+        return True
+
+    def _longest_at(self, lowered, q):
+        """All key end offsets starting at q, longest first."""
+        node = self.root
+        ends = []
+        i = q
+        n = len(lowered)
+        while i < n:
+            node = node.get(lowered[i])
+            if node is None:
+                break
+            i += 1
+            if _END in node:
+                ends.append((i, node[_END]))
+        ends.reverse()
+        return ends
+
+    @staticmethod
+    def _suffix_end(text, e):
+        """Where the lazy suffix group ends after a key ending at e, or -1."""
+        n = len(text)
+        while e < n and _is_word(text[e]):
+            # Only '_' is both a word char and an allowed suffix char
+            if text[e] != '_':
+                return -1
+            e += 1
+        return e
+
+    @staticmethod
+    def _prefix_ok(text, q, floor):
+        """True if some p in [floor, q] passes (?<!\\w) with only prefix chars between p and q."""
+        p = q
+        while True:
+            if p == 0 or not _is_word(text[p - 1]):
+                return True
+            if p <= floor or text[p - 1] not in PREFIX_CHARS:
+                return False
+            p -= 1
+
+    def finditer(self, text):
+        """Yield (start, end, value) for every replacement, left to right."""
+        if not self.size or not text:
+            return
+        lowered = _lower_same_length(text)
+        n = len(text)
+        q = 0
+        floor = 0
+        root = self.root
+        while q < n:
+            if lowered[q] in root and self._prefix_ok(text, q, floor):
+                for e, value in self._longest_at(lowered, q):
+                    resume = self._suffix_end(text, e)
+                    if resume != -1:
+                        yield q, e, value
+                        floor = resume
+                        q = max(resume, e)
+                        break
+                else:
+                    q += 1
+                continue
+            q += 1
+
+    def replace(self, text):
+        parts = []
+        last = 0
+        for start, end, value in self.finditer(text):
+            parts.append(text[last:start])
+            parts.append(value)
+            last = end
+        if not parts:
+            return text
+        parts.append(text[last:])
+        return ''.join(parts)
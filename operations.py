@@ -5,17 +5,27 @@ from collections import defaultdict
 import sqlparse
 from sqlparse.sql import Token
 from sqlparse.tokens import Literal,String
+from matcher import KeywordMatcher, company_core
+from sql_template import SqlTemplateCache
+from mapping_store import BACKWARD, FORWARD, MappingStore, is_store_path
 
 class DbOperations:
-    def __init__(self):
-        self.map_path='desc_mapping.json'
+    def __init__(self, map_path='desc_mapping.json'):
+        self.map_path=map_path
+        self.store = None
         self.forward_mapping = defaultdict(dict)
         self.backward_mapping = defaultdict(dict)
         # self.model=GLiNER.from_pretrained("urchade/gliner_base")
-        with open(self.map_path, 'r') as f:
-            data= json.load(f)
-            self.forward_mapping = data.get('forward_mapping', {})
-            self.backward_mapping = data.get('backward_mapping', {})
+        if is_store_path(self.map_path):
+            # SQLite store: opens instantly, values are looked up on demand
+            self.store = MappingStore(self.map_path)
+            self.forward_mapping = self.store.forward_view()
+            self.backward_mapping = self.store.backward_view()
+        else:
+            with open(self.map_path, 'r') as f:
+                data= json.load(f)
+                self.forward_mapping = data.get('forward_mapping', {})
+                self.backward_mapping = data.get('backward_mapping', {})
         self.entity_column_map={
         'name': 'names',
         'company': 'company',
@@ -24,6 +34,15 @@ class DbOperations:
 
         }
         self.descriptive_columns = []
+        # Literal-aware SQL path; set to False to always go through sqlparse
+        self.sql_fast_path = True
+        self.sql_template_cache = SqlTemplateCache(maxsize=1024)
+        self._mask_matcher = None
+        self._unmask_matcher = None
+        self._build_indexes()
+        # The store builds its matchers on the first description that needs them
+        if self.store is None:
+            self._build_matchers()
     @staticmethod
     def time_it(func):
         def wrapper(*args, **kwargs):
@@ -33,87 +52,118 @@ class DbOperations:
             print(f'\n⏳ Execution time {func.__name__}: {end-start:.6f} seconds')
             return result
         return wrapper
-    @time_it
-    def mask_sentence(self, sentence):
+    @property
+    def mask_matcher(self):
+        if self._mask_matcher is None:
+            self._build_matchers()
+        return self._mask_matcher
 
+    @property
+    def unmask_matcher(self):
+        if self._unmask_matcher is None:
+            self._build_matchers()
+        return self._unmask_matcher
+
+    def _build_matchers(self):
+        """Build the keyword matchers once from the loaded mappings."""
+        self._mask_matcher = KeywordMatcher()
+        self._unmask_matcher = KeywordMatcher()
         flat_map = {}
         for entity, value_map in self.forward_mapping.items():
             for original, fake in value_map.items():
                 flat_map[original] = fake
-        # Pre-lowercased lookup for fast replacement
-        flat_map_lower = {k.lower(): v for k, v in flat_map.items()}
-        # Identify which keys are present in the sentence (case-insensitive)
-        sentence_lower = sentence.lower()
-        matched_keys = [k for k in flat_map if k.lower() in sentence_lower]
-
-        if matched_keys:
-            # Sort matched keys by length (longest first) to avoid partial replacement
-            matched_keys.sort(key=len, reverse=True)
-
-            # Build regex pattern with alternation
-
-            pattern = re.compile(
-                r'(?<!\w)([\{\(\["\'\*\_]*?)(' +
-                '|'.join(re.escape(k) for k in matched_keys) +
-                r')([\}\)\]"\'\*\_]*?)(?!\w)',flags=re.IGNORECASE
-            )
-            def replace_match(match):
-                prefix = match.group(1)  # e.g., '{' or '**'
-                core = match.group(2)    # e.g., 'abc'
-                suffix = match.group(3)  # e.g., '}' or '**'
-
-                replaced = flat_map_lower.get(core.lower(), core)
-                # print(f'{match.group(0)} => {prefix}{replaced}{suffix}')
-                return f"{prefix}{replaced}{suffix}"
-            sentence = pattern.sub(replace_match, sentence)
-
-        return sentence
-    
-    @time_it
-    def unmask_summary(self, sentence):
+        for original, fake in flat_map.items():
+            self._mask_matcher.add(original, fake)
         flat_map = {}
         for entity, value_map in self.backward_mapping.items():
+            for fake, original in value_map.items():
+                flat_map[fake] = original
+        for fake, original in flat_map.items():
+            self._index_fake(fake, original)
+
+    def _build_indexes(self):
+        # One merged hash index per direction for SQL tokens, first entity wins
+        if self.store is not None:
+            self.forward_index = self.store.merged_view(FORWARD)
+            self.backward_index = self.store.merged_view(BACKWARD)
+            return
+        self.forward_index = {}
+        for value_map in self.forward_mapping.values():
             for original, fake in value_map.items():
-                flat_map[original] = fake
-        # Pre-lowercased lookup for fast replacement
-        flat_map_lower = {}
-        for fake,original in flat_map.items():
-            fake_lower=fake.lower()
-            flat_map_lower[fake_lower]=original
-
-            core=re.sub(r'\b(co|llc|inc|group|international|corporation|ltd|)\.?$', '', fake_lower, flags=re.IGNORECASE).strip()
-            if core and core!= fake_lower:
-                flat_map_lower[core]=original
-        # Identify which keys are present in the sentence (case-insensitive)
-        sentence_lower = sentence.lower()
-        matched_keys = [k for k in flat_map_lower if k in sentence_lower]
-
-        if matched_keys:
-            # Sort matched keys by length (longest first) to avoid partial replacement
-            matched_keys.sort(key=len, reverse=True)
-
-            # Build regex pattern with alternation
-            pattern = re.compile(
-                r'(?<!\w)([\{\(\["\'\*\_]*?)(' +
-                '|'.join(re.escape(k) for k in matched_keys) +
-                r')([\}\)\]"\'\*\_]*?)(?!\w)',flags=re.IGNORECASE
-            )
-
-            def replace_match(match):
-                prefix = match.group(1)  # e.g., '{' or '**'
-                core = match.group(2)    # e.g., 'abc'
-                suffix = match.group(3)  # e.g., '}' or '**'
-
-                replaced = flat_map_lower.get(core.lower(), core)
-                # print(f'{match.group(0)} => {prefix}{replaced}{suffix}')
-                return f"{prefix}{replaced}{suffix}"
-
-            sentence = pattern.sub(replace_match, sentence)
-
-        return sentence
+                self.forward_index.setdefault(original, fake)
+        self.backward_index = {}
+        for value_map in self.backward_mapping.values():
+            for fake, original in value_map.items():
+                self.backward_index.setdefault(fake, original)
+
+    @staticmethod
+    def _reindex(index, mapping, key):
+        if not isinstance(index, dict):
+            return  # store views are always current
+        for value_map in mapping.values():
+            if key in value_map:
+                index[key] = value_map[key]
+                return
+        index.pop(key, None)
+
+    def _index_fake(self, fake, original):
+        fake_lower = fake.lower()
+        self._unmask_matcher.add(fake_lower, original)
+        # Also match the company without its co/llc/inc/... suffix
+        core = company_core(fake_lower)
+        if core:
+            self._unmask_matcher.add(core, original)
+
+    def add_mapping(self, entity, original, fake):
+        """Record a new original/fake pair and update the matchers in place."""
+        if original in self.forward_mapping.get(entity, {}):
+            self.remove_mapping(entity, original)
+        self.forward_mapping.setdefault(entity, {})[original] = fake
+        self.backward_mapping.setdefault(entity, {})[fake] = original
+        if self._mask_matcher is not None:
+            self._mask_matcher.add(original, fake)
+            self._index_fake(fake, original)
+        self._reindex(self.forward_index, self.forward_mapping, original)
+        self._reindex(self.backward_index, self.backward_mapping, fake)
+
+    def remove_mapping(self, entity, original):
+        """Drop a pair from the mappings and the matchers."""
+        fake = self.forward_mapping.get(entity, {}).pop(original, None)
+        if fake is None:
+            return
+        self.backward_mapping.get(entity, {}).pop(fake, None)
+        if self._mask_matcher is not None:
+            self._mask_matcher.remove(original)
+            fake_lower = fake.lower()
+            self._unmask_matcher.remove(fake_lower)
+            core = company_core(fake_lower)
+            if core:
+                self._unmask_matcher.remove(core)
+            # Another entity may still hold the same key
+            for value_map in self.forward_mapping.values():
+                if original in value_map:
+                    self._mask_matcher.add(original, value_map[original])
+            for value_map in self.backward_mapping.values():
+                for other_fake, other_original in value_map.items():
+                    if other_fake.lower() in (fake_lower, core):
+                        self._index_fake(other_fake, other_original)
+        self._reindex(self.forward_index, self.forward_mapping, original)
+        self._reindex(self.backward_index, self.backward_mapping, fake)
+
+    @time_it
+    def mask_sentence(self, sentence):
+        return self.mask_matcher.replace(sentence)
+
+    @time_it
+    def unmask_summary(self, sentence):
+        return self.unmask_matcher.replace(sentence)
 
     @time_it
-    def query_mask(self, query):
+    def query_mask(self, query, fast=None):
+        if self.sql_fast_path if fast is None else fast:
+            result = self.sql_template_cache.render(query, self.forward_index)
+            if result is not None:
+                return result
         parsed = sqlparse.parse(query)
         masked_query = []
 
@@ -141,7 +191,11 @@ class DbOperations:
 
         return ''.join(masked_query)
     @time_it
-    def query_unmask(self, query):
+    def query_unmask(self, query, fast=None):
+        if self.sql_fast_path if fast is None else fast:
+            result = self.sql_template_cache.render(query, self.backward_index)
+            if result is not None:
+                return result
         parsed = sqlparse.parse(query)
         masked_query = []
 
@@ -206,6 +260,99 @@ class DbOperations:
             de_anonymized.append(new_row)
         return de_anonymized
 
+    @time_it
+    def masking_results_batch(self, results):
+        """Columnar masking_results for a list of dicts, pandas/polars DataFrame or Arrow table."""
+        return self._map_columns(results, self.forward_mapping, self.mask_matcher)
+
+    @time_it
+    def unmasking_results_batch(self, results):
+        """Columnar unmasking_results for a list of dicts, pandas/polars DataFrame or Arrow table."""
+        return self._map_columns(results, self.backward_mapping, self.unmask_matcher)
+
+    def _translate_values(self, values, entity, value_map, matcher):
+        """Translate distinct values the same way the row-wise functions do per cell."""
+        translated = []
+        for val in values:
+            if entity == 'description' and isinstance(val, str):
+                val = matcher.replace(val)
+            if value_map is not None and val in value_map:
+                val = value_map[val]
+            translated.append(val)
+        return translated
+
+    def _map_columns(self, results, mapping, matcher):
+        # Each column is reduced to its distinct values, translated once, and
+        # mapped back with a single vectorized lookup
+        kind = type(results).__module__.split('.')[0]
+        if kind == 'pandas':
+            return self._map_pandas(results, mapping, matcher)
+        if kind == 'polars':
+            return self._map_polars(results, mapping, matcher)
+        if kind == 'pyarrow':
+            return self._map_arrow(results, mapping, matcher)
+
+        new_rows = [dict(row) for row in results]
+        columns = {}
+        for row in new_rows:
+            for col in row:
+                columns.setdefault(col, None)
+        for col in columns:
+            entity = self.entity_column_map.get(col.lower())
+            value_map = mapping.get(f"{entity}")
+            if entity != 'description' and value_map is None:
+                continue
+            rows = [row for row in new_rows if col in row]
+            lookup = {}
+            for row in rows:
+                lookup.setdefault(row[col], None)
+            lookup = dict(zip(lookup, self._translate_values(lookup, entity, value_map, matcher)))
+            for row in rows:
+                row[col] = lookup[row[col]]
+        return new_rows
+
+    def _map_pandas(self, df, mapping, matcher):
+        df = df.copy()
+        for col in df.columns:
+            entity = self.entity_column_map.get(str(col).lower())
+            value_map = mapping.get(f"{entity}")
+            if entity != 'description' and value_map is None:
+                continue
+            uniques = df[col].dropna().unique().tolist()
+            lookup = dict(zip(uniques, self._translate_values(uniques, entity, value_map, matcher)))
+            df[col] = df[col].map(lookup, na_action='ignore')
+        return df
+
+    def _map_polars(self, df, mapping, matcher):
+        import polars as pl
+        exprs = []
+        for col, dtype in df.schema.items():
+            entity = self.entity_column_map.get(col.lower())
+            value_map = mapping.get(f"{entity}")
+            if dtype != pl.String or (entity != 'description' and value_map is None):
+                continue
+            uniques = df[col].drop_nulls().unique(maintain_order=True).to_list()
+            translated = self._translate_values(uniques, entity, value_map, matcher)
+            exprs.append(pl.col(col).replace(uniques, translated))
+        return df.with_columns(exprs) if exprs else df
+
+    def _map_arrow(self, table, mapping, matcher):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        for i, col in enumerate(table.column_names):
+            entity = self.entity_column_map.get(col.lower())
+            value_map = mapping.get(f"{entity}")
+            column = table.column(i)
+            if not (pa.types.is_string(column.type) or pa.types.is_large_string(column.type)):
+                continue
+            if entity != 'description' and value_map is None:
+                continue
+            uniques = pc.unique(column).drop_null()
+            translated = pa.array(self._translate_values(uniques.to_pylist(), entity, value_map, matcher), type=column.type)
+            indices = pc.index_in(column, value_set=uniques)
+            table = table.set_column(i, col, pc.take(translated, indices))
+        return table
+
 # Example usage
 def main():
 
@@ -230,13 +377,14 @@ def main():
     print("unmasked query:", unmasked_query)
     # print(op.masking_results(aa))
     # print("unmasked result: ",op.unmasking_results(masked_res))
-op=DbOperations()
-# sentence = 'name is ibm '
-# print("masked is: ",op.mask_sentence(sentence))
-# summary='name is Williams-Waller co'
-# print("unmasked is: ", op.unmask_summary(summary))
-aa=[{'Name':'Alice Johnson', 'Company':'TechNova','location':'New York', 'Description':'Alice Johnson recently joined TechNova as a software engineer.'},{'Name':'Carla Davis', 'Company':'CyberNest','location':'Chicago', 'Description': 'Carla Davis has worked at CyberNest for over 5 years.SHE IS A  FRIEND OF ALICE JOHNSON.'}]
-print(op.masking_results(aa))
-
-ff=[{'Name': 'Theresa Williams', 'Company': 'Williams-Waller Co', 'location': 'Port Brett, Delaware Region', 'Description': 'Theresa Williams recently joined Williams-Waller Co as a software engineer.'}, {'Name': 'Frances Wagner', 'Company': 'Harris-Roman Group', 'location': 'Smithbury, Delaware District', 'Description': 'Frances Wagner has worked at Harris-Roman Group for over 5 years.'}]
-print(op.unmasking_results(ff))
\ No newline at end of file
+if __name__ == "__main__":
+    op=DbOperations()
+    # sentence = 'name is ibm '
+    # print("masked is: ",op.mask_sentence(sentence))
+    # summary='name is Williams-Waller co'
+    # print("unmasked is: ", op.unmask_summary(summary))
+    aa=[{'Name':'Alice Johnson', 'Company':'TechNova','location':'New York', 'Description':'Alice Johnson recently joined TechNova as a software engineer.'},{'Name':'Carla Davis', 'Company':'CyberNest','location':'Chicago', 'Description': 'Carla Davis has worked at CyberNest for over 5 years.SHE IS A  FRIEND OF ALICE JOHNSON.'}]
+    print(op.masking_results(aa))
+
+    ff=[{'Name': 'Theresa Williams', 'Company': 'Williams-Waller Co', 'location': 'Port Brett, Delaware Region', 'Description': 'Theresa Williams recently joined Williams-Waller Co as a software engineer.'}, {'Name': 'Frances Wagner', 'Company': 'Harris-Roman Group', 'location': 'Smithbury, Delaware District', 'Description': 'Frances Wagner has worked at Harris-Roman Group for over 5 years.'}]
+    print(op.unmasking_results(ff))
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import shutil
+
+import polars as pl
+from openpyxl import load_workbook
+
+# Worker-side helpers for DataMaskerCSV.parallel_anonymize. They stay at module
+# level (and never import v2) so spawn-based process pools can pickle them
+# without loading the faker data in every worker.
+
+
+def plan_partitions(file_path, chunk_size):
+    """One partition per sheet for workbooks, fixed row ranges for CSV."""
+    if file_path.endswith('.xlsx'):
+        wb = load_workbook(file_path, read_only=True)
+        try:
+            return [('sheet', name) for name in wb.sheetnames]
+        finally:
+            wb.close()
+    total = pl.scan_csv(file_path, infer_schema_length=0).select(pl.len()).collect().item()
+    return [('rows', start, min(chunk_size, total - start)) for start in range(0, total, chunk_size)]
+
+
+def read_partition(file_path, partition):
+    if partition[0] == 'sheet':
+        return pl.read_excel(file_path, engine='calamine', sheet_name=partition[1])
+    _, start, n_rows = partition
+    # Strings only, so every partition agrees on the mapping keys
+    return pl.read_csv(file_path, skip_rows_after_header=start, n_rows=n_rows, infer_schema_length=0)
+
+
+def extract_partition(task):
+    """Parse one partition, keep its sensitive columns and return their distinct values."""
+    part_id, file_path, partition, column_map, raw_path = task
+    df = read_partition(file_path, partition)
+    columns = [pl.col(col).cast(pl.String).alias(entity) for col, entity in column_map.items() if col in df.columns]
+    df = df.select(columns)
+    df.write_parquet(raw_path)
+    uniques = {entity: df[entity].drop_nulls().unique(maintain_order=True).to_list() for entity in df.columns}
+    return part_id, df.height, uniques
+
+
+def mask_partition(task):
+    """Apply the coordinator's lookups to one extracted partition and write it as CSV."""
+    part_id, raw_path, lookups, entities, out_path = task
+    df = pl.read_parquet(raw_path)
+    exprs = []
+    for entity in entities:
+        if entity not in df.columns:
+            exprs.append(pl.lit(None, dtype=pl.String).alias(entity))
+        elif lookups.get(entity):
+            lookup = lookups[entity]
+            exprs.append(pl.col(entity).replace_strict(list(lookup), list(lookup.values()), return_dtype=pl.String))
+        else:
+            exprs.append(pl.col(entity))
+    df.select(exprs).write_csv(out_path)
+    os.remove(raw_path)
+    return out_path
+
+
+def concatenate_csvs(part_paths, output_path):
+    """Join per-partition CSVs that share a header into one file."""
+    with open(output_path, 'wb') as out:
+        for i, part_path in enumerate(part_paths):
+            with open(part_path, 'rb') as f:
+                header = f.readline()
+                if i == 0:
+                    out.write(header)
+                shutil.copyfileobj(f, out)
+    return output_path
@@ -0,0 +1,85 @@
+import re
+from collections import OrderedDict
+
+# Same string literal rules sqlparse uses for String.Single / String.Symbol
+SQL_LITERAL_RE = re.compile(r"""('(?:''|\\'|[^'])*'|"(?:""|\\"|[^"])*")""")
+SQL_WORD_RE = re.compile(r'(\d+\.\d*|\w+)')
+# Comments, placeholders, bracket/backtick names and escapes are left to sqlparse
+SQL_UNSUPPORTED_RE = re.compile(r"""--|#|/\*|[`´\[\\'"]|%\(|(?<!\w)[$:?@]\w""")
+
+
+def compile_template(texts):
+    """Split the non-literal pieces of a query into alternating separators and words."""
+    for text in texts:
+        if SQL_UNSUPPORTED_RE.search(text):
+            return None
+    return [SQL_WORD_RE.split(text) for text in texts]
+
+
+class SqlTemplateCache:
+    """
+    Bounded LRU of parsed query templates keyed on the query shape.
+
+    The shape is the query with every string literal cut out, so repeated
+    queries that differ only in their literals reuse one tokenization. Shapes
+    the fast path can't handle are cached as None so callers fall back to
+    sqlparse without re-checking them.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.templates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.templates)
+
+    def clear(self):
+        self.templates.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, query):
+        """Return (template, literals); template is None if the query is unsupported."""
+        pieces = SQL_LITERAL_RE.split(query)
+        texts = pieces[0::2]
+        shape = '\x00'.join(texts)
+        if shape in self.templates:
+            self.hits += 1
+            self.templates.move_to_end(shape)
+            template = self.templates[shape]
+        else:
+            self.misses += 1
+            template = compile_template(texts)
+            self.templates[shape] = template
+            if len(self.templates) > self.maxsize:
+                self.templates.popitem(last=False)
+        return template, pieces[1::2]
+
+    def render(self, query, index):
+        """
+        Replace bare words and string literals found in index, keeping the
+        original quote style. Returns None when the query needs sqlparse.
+        """
+        template, literals = self.lookup(query)
+        if template is None:
+            return None
+        out = []
+        for i, parts in enumerate(template):
+            out.append(parts[0])
+            for j in range(1, len(parts), 2):
+                word = parts[j]
+                out.append(index.get(word, word))
+                out.append(parts[j + 1])
+            if i < len(literals):
+                raw = literals[i]
+                value = raw.strip("\"'")
+                if value not in index:
+                    out.append(raw)
+                elif raw.startswith("'") and raw.endswith("'"):
+                    out.append(f"'{index[value]}'")
+                elif raw.startswith('"') and raw.endswith('"'):
+                    out.append(f'"{index[value]}"')
+                else:
+                    out.append(index[value])
+        return ''.join(out)
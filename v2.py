@@ -13,9 +13,14 @@ import random
 import re
 import string
 import polars as pl
+from concurrent.futures import ProcessPoolExecutor
 from openpyxl import load_workbook
+from mapping_store import MappingStore, is_store_path
+from faker_pool import FakerPool
+from parallel_masker import concatenate_csvs, extract_partition, mask_partition, plan_partitions
+from fake_index import FALLBACK_FORMATTERS, FallbackGenerator, UrlGenerator, keyed_digest, keyed_index
 class DataMaskerCSV:
-    def __init__(self,file_path):
+    def __init__(self,file_path,map_path=None,indexed_fakes=False,secret_key=None):
         # self.entity_column_map={
         #                 'names': 'names',
         #                 'emails': 'emails',
@@ -29,6 +34,9 @@ class DataMaskerCSV:
         self.base_name=os.path.splitext(os.path.basename(self.file_path))[0]
         self.output_dir=self.base_name
         os.makedirs(self.output_dir, exist_ok=True)
+        # A .db/.sqlite map_path keeps the mapping in a MappingStore instead of JSON
+        self.map_path = map_path or f'{self.base_name}_mapping.json'
+        self.store = MappingStore(self.map_path) if is_store_path(self.map_path) else None
         self.entity_column_map={
                 'Name': 'names',
                 'Company': 'company',
@@ -37,14 +45,34 @@ class DataMaskerCSV:
         self.sensitive_columns = self.entity_column_map.keys()
         start=time.time()
         self.faker_data_path= 'faker_dataset_v3.json.gz'
-        with gzip.open(self.faker_data_path, 'rt',encoding='utf-8') as f:
-            faker_list = json.load(f)
+        self.faker_pool_dir = 'faker_pool'
+        if os.path.isdir(self.faker_pool_dir):
+            # Compact pool from faker_pool.py, each entity is memory-mapped on first use
+            self.faker_data = FakerPool(self.faker_pool_dir)
+        else:
+            with gzip.open(self.faker_data_path, 'rt',encoding='utf-8') as f:
+                faker_list = json.load(f)
+            self.faker_data = {}
+            for d in faker_list:
+                self.faker_data.update(d)
         end=time.time()
         print(f"⏳ Faker data loaded in {end-start:.6f} seconds")
-        self.faker_data = {}
-        for d in faker_list:
-            self.faker_data.update(d)
         self.domain_pool= self.faker_data['url']
+        # Index-based URL/fallback generation: the Nth value is distinct by construction
+        self.indexed_fakes = indexed_fakes
+        self.fake_counter = defaultdict(int)
+        if self.indexed_fakes:
+            key = random.getrandbits(64)
+            self.url_generator = UrlGenerator(self.domain_pool, key)
+            self.fallback_generators = {
+                entity: FallbackGenerator(self.faker_data[entity], key, formatter)
+                for entity, formatter in FALLBACK_FORMATTERS.items() if entity in self.faker_data
+            }
+        # Keyed mode: fakes come from HMAC(secret_key, entity, original) so shards agree without coordinating
+        self.secret_key = secret_key.encode('utf-8') if isinstance(secret_key, str) else secret_key
+        self.max_probes = 16
+        if self.secret_key is not None:
+            self.keyed_url_pool = UrlGenerator(self.domain_pool, key=0)
         self.forward_mapping = defaultdict(dict)
         self.backward_mapping = defaultdict(dict)
         self.mapping= defaultdict(dict)
@@ -141,13 +169,29 @@ class DataMaskerCSV:
 
         if original_value in self.forward_mapping[col_key]:
             return self.forward_mapping[col_key][original_value]
+        if self.store is not None:
+            stored = self.store.get_fake(col_key, original_value)
+            if stored is not None:
+                self.forward_mapping[col_key][original_value] = stored
+                self.backward_mapping[col_key][stored] = original_value
+                return stored
+        if self.secret_key is not None:
+            for fake_value in self._keyed_candidates(entity, original_value):
+                if not self._fake_in_use(entity, fake_value):
+                    self.used_fakes[entity].add(fake_value)
+                    self.forward_mapping[col_key][original_value] = fake_value
+                    self.backward_mapping[col_key][fake_value] = original_value
+                    return fake_value
         if entity =='url':
-            while True:
-                domain1,domain2=random.sample(self.domain_pool,2)
-                fake_value=f"https://{domain1.lower()}.{domain2.lower()}.co"
-                if fake_value not in self.used_fakes[entity]:
-                    break
-            self.used_fakes[entity].add(fake_value)
+            if self.indexed_fakes:
+                fake_value = self._next_indexed(entity, self.url_generator)
+            else:
+                while True:
+                    domain1,domain2=random.sample(self.domain_pool,2)
+                    fake_value=f"https://{domain1.lower()}.{domain2.lower()}.co"
+                    if not self._fake_in_use(entity, fake_value):
+                        break
+                self.used_fakes[entity].add(fake_value)
             self.forward_mapping[col_key][original_value] = fake_value
             self.backward_mapping[col_key][fake_value] = original_value
             return fake_value
@@ -156,24 +200,69 @@ class DataMaskerCSV:
             fake_value = self.faker_data[entity][self.fake_data_index[entity]]
             self.fake_data_index[entity] += 1
 
-            if fake_value not in self.used_fakes[entity]:
+            if not self._fake_in_use(entity, fake_value):
                 self.used_fakes[entity].add(fake_value)
                 self.forward_mapping[col_key][original_value] = fake_value
                 self.backward_mapping[col_key][fake_value] = original_value
                 return fake_value
         
+        if self.indexed_fakes and entity in self.fallback_generators:
+            fallback_value = self._next_indexed(entity, self.fallback_generators[entity])
+            self.forward_mapping[col_key][original_value] = fallback_value
+            self.backward_mapping[col_key][fallback_value] = original_value
+            return fallback_value
+
         counter=1
         base_fake_value=original_value
         while True:
             fallback_value= self.modify_fake_value(entity, base_fake_value,  counter=counter)
-            if fallback_value not in self.used_fakes[entity]:
+            if not self._fake_in_use(entity, fallback_value):
                 self.used_fakes[entity].add(fallback_value)
                 self.forward_mapping[col_key][original_value] = fallback_value
                 self.backward_mapping[col_key][fallback_value] = original_value
                 return fallback_value
             counter+=1
 
-        
+
+    def _mask_series(self, entity, series):
+        """Assign fakes to the distinct values of a column, then map them back in one pass."""
+        # unique() keeps first-appearance order, so fakes come out exactly as a per-cell apply would
+        uniques = series.dropna().unique()
+        lookup = {val: self._get_fake_value(entity, val) for val in uniques}
+        return series.map(lookup, na_action='ignore')
+
+    def _keyed_candidates(self, entity, original_value):
+        """Deterministic probe sequence for keyed mode: pool slots first, then suffixed fallbacks."""
+        pool = self.keyed_url_pool if entity == 'url' else self.faker_data.get(entity)
+        if not pool:
+            return
+        for attempt in range(self.max_probes):
+            yield pool[keyed_index(self.secret_key, entity, original_value, attempt, len(pool))]
+        formatter = FALLBACK_FORMATTERS.get(entity)
+        attempt = self.max_probes
+        while True:
+            digest = keyed_digest(self.secret_key, entity, original_value, attempt)
+            base = pool[int.from_bytes(digest[:8], 'little') % len(pool)]
+            block = int.from_bytes(digest[8:12], 'little')
+            yield formatter(base, block) if formatter else f"{base}-{block}"
+            attempt += 1
+
+    def _next_indexed(self, entity, generator):
+        """Next value from an index-based generator, constant time per value."""
+        while True:
+            index = self.fake_counter[entity]
+            self.fake_counter[entity] += 1
+            fake_value = generator[index]
+            # Only clashes with pool fakes or the store can skip an index
+            if not self._fake_in_use(entity, fake_value):
+                return fake_value
+
+    def _fake_in_use(self, entity, fake_value):
+        """True if the fake is taken in this run or by a pair already in the store."""
+        if fake_value in self.used_fakes[entity]:
+            return True
+        return self.store is not None and self.store.get_original(entity, fake_value) is not None
+
     def modify_fake_value(self,entity,original_value,counter=1):
         """Modify the fake value to ensure uniqueness."""
         if entity=="names":
@@ -211,37 +300,220 @@ class DataMaskerCSV:
                 print(f"Warning: No fake data available for entity type '{entity}' '.")
                 continue
 
-            df[entity] = df[entity].apply(lambda val: self._get_fake_value(entity, val) if pd.notna(val) else val)
+            df[entity] = self._mask_series(entity, df[entity])
 
         output_csv_path=os.path.join(self.output_dir,f'{self.base_name}_masked.csv')
         df.to_csv(output_csv_path, index=False)
 
+        self._save_mapping()
+
+    def _save_mapping(self):
+        """Persist the mapping to the store or to the JSON map file."""
+        return self._write_mapping(self.forward_mapping, self.backward_mapping, self.map_path, self.store)
+
+    def _write_mapping(self, forward_mapping, backward_mapping, map_path, store=None):
         combined_mapping = {
             "metadata": {
                 "timestamp": datetime.now().isoformat(),
-                "columns_anonymized": list(self.forward_mapping.keys()),
+                "columns_anonymized": list(forward_mapping.keys()),
                 "total_entries": {
-                    col: len(self.forward_mapping[col]) for col in self.forward_mapping
+                    col: len(forward_mapping[col]) for col in forward_mapping
                 }
             },
-            "forward_mapping": self.forward_mapping,
-            "backward_mapping": self.backward_mapping,
+            "forward_mapping": forward_mapping,
+            "backward_mapping": backward_mapping,
         }
-        map_path =f'{self.base_name}_mapping.json'
-        with open(map_path, 'w') as f: 
-            json.dump(combined_mapping, f, indent=2)
+        if store is None and is_store_path(map_path):
+            store = MappingStore(map_path)
+        if store is not None:
+            # Only this run's pairs are written, in one transaction
+            store.add_pairs(
+                (entity, original, fake)
+                for entity, value_map in forward_mapping.items()
+                for original, fake in value_map.items()
+            )
+            store.set_metadata(**combined_mapping['metadata'])
+        else:
+            with open(map_path, 'w') as f: 
+                json.dump(combined_mapping, f, indent=2)
 
 
         # print(f"Anonymized CSV saved to: {output_csv_path}")
         print(f" mapping saved to: {map_path}")
-  
-    
+        return map_path
+
+    @staticmethod
+    def _load_forward_mapping(map_path):
+        if is_store_path(map_path):
+            store = MappingStore(map_path)
+            forward_mapping, _ = store.to_dicts()
+            store.close()
+            return forward_mapping
+        with open(map_path, 'r') as f:
+            return json.load(f).get("forward_mapping", {})
+
+    @time_it
+    def merge_shard_mappings(self, map_paths, out_path):
+        """
+        Combine the mappings written by keyed-mode shards into one map file or store.
+
+        Shards only resolve collisions among the values they saw, so two shards
+        can hand the same fake to different originals. Originals are settled in
+        HMAC digest order: each keeps the first fake a shard issued for it if
+        still free, otherwise the earliest free fake of its probe sequence.
+        Returns {entity: {original: new_fake}} for originals whose fake
+        changed; shards holding them can be re-masked against the merged
+        store, which takes precedence over fresh assignment.
+        """
+        if self.secret_key is None:
+            raise ValueError("merge_shard_mappings needs the secret_key the shards were masked with")
+        claims = defaultdict(dict)
+        for map_path in map_paths:
+            for entity, value_map in self._load_forward_mapping(map_path).items():
+                for original, fake in value_map.items():
+                    claims[entity].setdefault(original, {})[fake] = None
+
+        forward_mapping = defaultdict(dict)
+        backward_mapping = defaultdict(dict)
+        reassigned = defaultdict(dict)
+        for entity, originals in claims.items():
+            order = sorted(originals, key=lambda original: keyed_digest(self.secret_key, entity, original))
+            for original in order:
+                fakes = originals[original]
+                taken = backward_mapping[entity]
+                # Keep a fake a shard already issued if it is still free, else the first free probe
+                chosen = next((fake for fake in fakes if fake not in taken), None)
+                if chosen is None:
+                    chosen = next((c for c in self._keyed_candidates(entity, original) if c not in taken), None)
+                if chosen is None:
+                    raise RuntimeError(f"Could not resolve a fake for {entity!r} value {original!r}")
+                if len(fakes) != 1 or chosen not in fakes:
+                    reassigned[entity][original] = chosen
+                forward_mapping[entity][original] = chosen
+                backward_mapping[entity][chosen] = original
+        if reassigned:
+            print(f"Warning: {sum(len(v) for v in reassigned.values())} values were reassigned while merging shards")
+        self._write_mapping(forward_mapping, backward_mapping, out_path)
+        return dict(reassigned)
+
+    @time_it
+    def parallel_anonymize(self, workers=None, chunk_size=250_000, concatenate=True):
+        """
+        Mask sheets (workbooks) or row chunks (CSV) in a process pool.
+
+        Workers parse their partition and send back its distinct values per
+        entity; this process alone assigns fakes, in partition order, so the
+        mapping stays globally unique and matches a sequential run. Workers
+        then apply the lookups and write parts/part-NNNNN.csv, optionally
+        concatenated into <base>_masked.csv.
+        """
+        workers = workers or os.cpu_count()
+        parts_dir = os.path.join(self.output_dir, 'parts')
+        os.makedirs(parts_dir, exist_ok=True)
+        column_map = {col: self.entity_column_map[col] for col in self.sensitive_columns}
+        entities = list(dict.fromkeys(column_map.values()))
+        partitions = plan_partitions(self.file_path, chunk_size)
+        tasks = [
+            (part_id, self.file_path, partition, column_map, os.path.join(parts_dir, f'part-{part_id:05d}.parquet'))
+            for part_id, partition in enumerate(partitions)
+        ]
+        missing = set()
+        rows = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            mask_futures = []
+            # map() yields in partition order even when workers finish out of order
+            for part_id, part_rows, uniques in pool.map(extract_partition, tasks):
+                rows += part_rows
+                lookups = {}
+                for entity, values in uniques.items():
+                    if entity not in self.faker_data:
+                        if entity not in missing:
+                            print(f"Warning: No fake data available for entity type '{entity}' '.")
+                            missing.add(entity)
+                        continue
+                    lookups[entity] = {val: self._get_fake_value(entity, val) for val in values}
+                out_path = os.path.join(parts_dir, f'part-{part_id:05d}.csv')
+                mask_futures.append(pool.submit(mask_partition, (part_id, tasks[part_id][4], lookups, entities, out_path)))
+            part_paths = [future.result() for future in mask_futures]
+        print(f"Masked {rows} rows in {len(part_paths)} partitions with {workers} workers")
+        self._save_mapping()
+        if concatenate and part_paths:
+            output_csv_path = os.path.join(self.output_dir, f'{self.base_name}_masked.csv')
+            concatenate_csvs(part_paths, output_csv_path)
+            return output_csv_path
+        return part_paths
+
+    def _iter_source_chunks(self, chunk_size):
+        """Yield DataFrames of at most chunk_size rows, sheet by sheet for workbooks."""
+        if self.file_path.endswith('.xlsx'):
+            # read_only keeps openpyxl from loading the whole sheet
+            wb = load_workbook(self.file_path, read_only=True, data_only=True)
+            try:
+                for ws in wb.worksheets:
+                    rows = ws.iter_rows(values_only=True)
+                    header = next(rows, None)
+                    if header is None:
+                        continue
+                    header = [str(h) if h is not None else f'column_{i}' for i, h in enumerate(header)]
+                    width = len(header)
+                    batch = []
+                    for row in rows:
+                        row = tuple(row[:width]) + (None,) * (width - len(row))
+                        batch.append(row)
+                        if len(batch) >= chunk_size:
+                            yield pd.DataFrame(batch, columns=header)
+                            batch = []
+                    if batch:
+                        yield pd.DataFrame(batch, columns=header)
+            finally:
+                wb.close()
+        else:
+            yield from pd.read_csv(self.file_path, chunksize=chunk_size)
+
+    @time_it
+    def stream_anonymize(self, chunk_size=50_000, output_csv_path=None):
+        """
+        Mask the source chunk by chunk without intermediate files.
+
+        Memory is bounded by chunk_size plus the mapping itself. Unlike
+        csv_extraction, rows stay aligned with the source (nulls are kept in
+        place instead of being compacted per column). Fakes are assigned in
+        the same per-entity order, so the mapping is the same.
+        """
+        if output_csv_path is None:
+            output_csv_path = os.path.join(self.output_dir, f'{self.base_name}_masked.csv')
+        missing = set()
+        rows = 0
+        with open(output_csv_path, 'w', newline='', encoding='utf-8') as out:
+            for chunk in self._iter_source_chunks(chunk_size):
+                masked = pd.DataFrame(index=chunk.index)
+                for col in self.sensitive_columns:
+                    entity = self.entity_column_map[col]
+                    if col not in chunk.columns:
+                        masked[entity] = None
+                        continue
+                    if entity not in self.faker_data:
+                        if entity not in missing:
+                            print(f"Warning: No fake data available for entity type '{entity}' '.")
+                            missing.add(entity)
+                        masked[entity] = chunk[col]
+                        continue
+                    masked[entity] = self._mask_series(entity, chunk[col])
+                masked.to_csv(out, header=rows == 0, index=False)
+                rows += len(chunk)
+        print(f"Streamed {rows} rows to: {output_csv_path}")
+        self._save_mapping()
+        return output_csv_path
+
     @time_it
     def deanonymize_csv(self,anonymized_csv_path,map_path,deanonymized_csv_path):
         df = pd.read_csv(anonymized_csv_path)
 
-        with open(map_path, 'r') as f:
-            self.backward_mapping = json.load(f).get("backward_mapping", {})
+        if is_store_path(map_path):
+            self.backward_mapping = MappingStore(map_path).backward_view()
+        else:
+            with open(map_path, 'r') as f:
+                self.backward_mapping = json.load(f).get("backward_mapping", {})
         
         for col in self.sensitive_columns:
             entity= self.entity_column_map.get(col.lower())
@@ -262,6 +534,7 @@ class DataMaskerCSV:
         except Exception as e:
             print(f"❌ Failed to import CSV: {e}")
 
-file_path = 'desc.xlsx'
-masker = DataMaskerCSV(file_path)
-masker.csv_extraction()
+if __name__ == "__main__":
+    file_path = 'desc.xlsx'
+    masker = DataMaskerCSV(file_path)
+    masker.csv_extraction()